@@ -1,6 +1,21 @@
+from typing import Final
+
 import pytest
 
+from youtube_rss import config
+
+TEST_CHANNEL_ID: Final[str] = "UClGq6liZfYY3gcDFGLG-9cw"
+TEST_CHANNEL_TITLE: Final[str] = "Music"
+
 
 def pytest_configure():
-    pytest.TEST_CHANNEL_ID = "UClGq6liZfYY3gcDFGLG-9cw"
-    pytest.TEST_CHANNEL_TITLE = "Music"
+    pytest.TEST_CHANNEL_ID = TEST_CHANNEL_ID
+    pytest.TEST_CHANNEL_TITLE = TEST_CHANNEL_TITLE
+
+
+@pytest.fixture
+def database():
+    """The cached database handle, emptied for the test."""
+    database = config.CONFIG.get_database()
+    database.new()
+    return database
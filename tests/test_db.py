@@ -1,23 +1,28 @@
 from youtube_rss import config, db
 
 
-def test_save_fetch():
-    database = config.CONFIG.get_database()
-    database.new()
+def test_save_fetch(database):
     feed = db.Feed("A", "A", [])
     database.add(feed)
     result = database.fetch_one_or_none(db.Feed, channel_id="A")
     assert result == feed
 
 
-def test_database_save_load():
-    database = config.CONFIG.get_database()
-    database.new()
+def test_add_many(database):
+    feeds = [db.Feed("A", "A", []), db.Feed("B", "B", [])]
+    database.add_many(feeds)
+    assert database.fetch_all(db.Feed) == feeds
+
+
+def test_database_save_load(database):
     feed = db.Feed("A", "A", [])
     database.add(feed)
+    database.save()
     del database
 
-    database = config.CONFIG.get_database()
+    # build a fresh handle so the fetch below must come from disk rather than
+    # the cached database on CONFIG
+    database = db.JsonDatabase(filepath=config.CONFIG.DATABASE_PATH).connect()
     feeds = database.fetch_all(db.Feed)
     assert len(feeds) == 1
     assert isinstance(feeds[0], db.Feed)
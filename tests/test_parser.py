@@ -1,5 +1,6 @@
 import pytest
 
+import youtube_rss.db
 import youtube_rss.parser
 
 
@@ -9,6 +10,35 @@ def test_get_channel_query_results():
     assert len(results) > 1
 
 
+def test_parse_rss_entries():
+    rss_content = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015"
+      xmlns:media="http://search.yahoo.com/mrss/"
+      xmlns="http://www.w3.org/2005/Atom">
+ <entry>
+  <id>yt:video:abc123</id>
+  <title>Video One</title>
+  <link rel="alternate" href="https://www.youtube.com/watch?v=abc123"/>
+  <media:group>
+   <media:thumbnail url="https://i.ytimg.com/vi/abc123/hqdefault.jpg"
+                    width="480" height="360"/>
+  </media:group>
+ </entry>
+</feed>"""
+    entries = youtube_rss.parser.parse_rss_entries(rss_content)
+    assert entries == [
+        youtube_rss.db.FeedEntry(
+            video_id="yt:video:abc123",
+            link="https://www.youtube.com/watch?v=abc123",
+            title="Video One",
+            thumbnail="https://i.ytimg.com/vi/abc123/hqdefault.jpg",
+            seen=False,
+        )
+    ]
+
+
 def test_get_rss_entries_from_channel_id():
-    result = youtube_rss.parser.get_rss_entries_from_channel_id(pytest.TEST_CHANNEL_ID)
-    assert len(result) > 0
+    entries, _, _ = youtube_rss.parser.get_rss_entries_from_channel_id(
+        pytest.TEST_CHANNEL_ID
+    )
+    assert len(entries) > 0
@@ -1,6 +1,6 @@
 import pytest
 
-from youtube_rss import config, db, youtube_rss
+from youtube_rss import db, youtube_rss
 
 
 def test_refresh_subscriptions__empty():
@@ -8,9 +8,7 @@ def test_refresh_subscriptions__empty():
     youtube_rss.refresh_subscriptions_by_channel_id(feeds)
 
 
-def test_refresh_subscriptions():
-    database = config.CONFIG.get_database()
-    database.new()
+def test_refresh_subscriptions(database):
     feed = db.Feed(pytest.TEST_CHANNEL_ID, pytest.TEST_CHANNEL_TITLE, [])
     database.add(feed)
     youtube_rss.refresh_subscriptions_by_channel_id([feed])
@@ -19,9 +17,7 @@ def test_refresh_subscriptions():
     assert len(feed_.entries) > 1
 
 
-def test_subscribe():
-    database = config.CONFIG.get_database()
-    database.new()
+def test_subscribe(database):
     youtube_rss.add_subscription_to_database(
         pytest.TEST_CHANNEL_ID, pytest.TEST_CHANNEL_TITLE, refresh=True
     )
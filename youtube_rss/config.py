@@ -1,3 +1,4 @@
+import functools
 import logging
 import os
 from pathlib import Path
@@ -7,6 +8,7 @@ from . import db
 logger = logging.getLogger("youtube_rss.config")
 
 
+@functools.lru_cache(maxsize=None)
 def get_app_data_directory() -> Path:
     if os.name == "nt":
         app_data_dir = os.environ.get("APPDATA")
@@ -26,12 +28,6 @@ def get_app_data_directory() -> Path:
 
 
 class Config:
-    YOUTUBE_RSS_DIR = get_app_data_directory() / "youtube_rss"
-    THUMBNAIL_DIR = YOUTUBE_RSS_DIR / "thumbnails"
-    THUMBNAIL_SEARCH_DIR = THUMBNAIL_DIR / "search"
-    DATABASE_PATH = YOUTUBE_RSS_DIR / "database"
-    LOG_PATH = YOUTUBE_RSS_DIR / "run.log"
-
     HIGHLIGHTED = 1
     NOT_HIGHLIGHTED = 2
 
@@ -40,20 +36,46 @@ class Config:
     USE_THUMBNAILS = False
 
     def __init__(self) -> None:
-        self.YOUTUBE_RSS_DIR.mkdir(parents=True, exist_ok=True)
-        self.THUMBNAIL_DIR.mkdir(parents=True, exist_ok=True)
-        self.THUMBNAIL_SEARCH_DIR.mkdir(parents=True, exist_ok=True)
         self._ui = None
+        self._database = None
+
+    @functools.cached_property
+    def YOUTUBE_RSS_DIR(self) -> Path:
+        directory = get_app_data_directory() / "youtube_rss"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    @functools.cached_property
+    def THUMBNAIL_DIR(self) -> Path:
+        directory = self.YOUTUBE_RSS_DIR / "thumbnails"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    @functools.cached_property
+    def THUMBNAIL_SEARCH_DIR(self) -> Path:
+        directory = self.THUMBNAIL_DIR / "search"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    @functools.cached_property
+    def DATABASE_PATH(self) -> Path:
+        return self.YOUTUBE_RSS_DIR / "database"
+
+    @functools.cached_property
+    def LOG_PATH(self) -> Path:
+        return self.YOUTUBE_RSS_DIR / "run.log"
 
     def get_database(self) -> db.IDatabase:
-        database = db.JsonDatabase({}, self.DATABASE_PATH)
-        if not CONFIG.DATABASE_PATH.is_file():
-            logger.info("Initializing new database")
-            database.new()
-        else:
-            database.connect()
-
-        return database
+        if self._database is None:
+            database = db.JsonDatabase({}, self.DATABASE_PATH)
+            if not self.DATABASE_PATH.is_file():
+                logger.info("Initializing new database")
+                database.new()
+            else:
+                database.connect()
+            self._database = database
+
+        return self._database
 
     def get_ui(self):
         from . import ui
@@ -3,12 +3,19 @@ from __future__ import annotations
 import dataclasses
 import json
 import logging
+import os
 import sys
-import threading
 from abc import ABC, ABCMeta, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Type, TypeVar, Union
+from typing import Iterable, List, Optional, Type, TypeVar, Union
+
+try:
+    # C serializer, considerably faster than the stdlib on a large database;
+    # the stdlib module remains as a fallback
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +68,8 @@ class FeedEntry(ITable):
     title: str
     thumbnail: Url
     seen: bool
+    # local path of the downloaded thumbnail, if any
+    thumbnail_file: Optional[str] = None
 
 
 @dataclass
@@ -68,6 +77,9 @@ class Feed(ITable):
     channel_id: ChannelID
     title: str
     entries: List[FeedEntry]
+    # validators from the last RSS response, used for conditional requests
+    etag: Optional[str] = None
+    modified: Optional[str] = None
 
 
 @dataclass
@@ -84,6 +96,10 @@ class IDatabase(ABC):
     def add(self, row: ITable) -> None:
         pass
 
+    @abstractmethod
+    def add_many(self, rows: Iterable[ITable]) -> None:
+        pass
+
     @abstractmethod
     def connect(self) -> IDatabase:
         pass
@@ -104,6 +120,10 @@ class IDatabase(ABC):
     def fetch_all(self, table_class: Type[T]) -> List[T]:
         pass
 
+    @abstractmethod
+    def mark_dirty(self) -> None:
+        pass
+
     @abstractmethod
     def remove(self, table_class: Type[T], **filter_by) -> None:
         pass
@@ -113,29 +133,48 @@ class IDatabase(ABC):
         pass
 
 
-class DatabaseEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, JsonDatabase):
-            return o._data
-        elif dataclasses.is_dataclass(o):
-            result = self._to_dict(o)
-            return result
+def _to_dict(obj):
+    if dataclasses._is_dataclass_instance(obj):
+        result = []
+        for f in dataclasses.fields(obj):
+            value = _to_dict(getattr(obj, f.name))
+            result.append((f.name, value))
 
-        return super().default(o)
+        data = dict(result)
+        data["__dataclass__"] = obj.__class__.__name__
+        return data
+    else:
+        return obj
 
-    @staticmethod
-    def _to_dict(obj):
-        if dataclasses._is_dataclass_instance(obj):
-            result = []
-            for f in dataclasses.fields(obj):
-                value = DatabaseEncoder._to_dict(getattr(obj, f.name))
-                result.append((f.name, value))
 
-            data = dict(result)
-            data["__dataclass__"] = obj.__class__.__name__
-            return data
-        else:
-            return obj
+def _encode_default(obj):
+    if dataclasses.is_dataclass(obj):
+        return _to_dict(obj)
+    if isinstance(obj, Path):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj)}")
+
+
+def _from_dict(data: dict):
+    """Rebuild a dataclass instance from a dict tagged with __dataclass__."""
+    try:
+        class_ = getattr(sys.modules[__name__], data["__dataclass__"])
+    except AttributeError:
+        return data
+    data = dict(data)
+    del data["__dataclass__"]
+    return class_(**data)
+
+
+def _decode(data):
+    """Post-order walk of a plain JSON tree rebuilding tagged dataclasses."""
+    if isinstance(data, list):
+        return [_decode(item) for item in data]
+    if isinstance(data, dict):
+        data = {key: _decode(value) for key, value in data.items()}
+        if "__dataclass__" in data:
+            return _from_dict(data)
+    return data
 
 
 class DatabaseDecoder(json.JSONDecoder):
@@ -143,15 +182,8 @@ class DatabaseDecoder(json.JSONDecoder):
         super().__init__(*args, **kwargs, object_hook=self.object_hook)
 
     def object_hook(self, data):
-        if isinstance(data, dict):
-            if "__dataclass__" in data:
-                try:
-                    class_ = getattr(sys.modules[__name__], data.pop("__dataclass__"))
-                except KeyError:
-                    pass
-                else:
-                    obj = class_(**data)
-                    return obj
+        if isinstance(data, dict) and "__dataclass__" in data:
+            return _from_dict(data)
 
         return data
 
@@ -164,90 +196,124 @@ class JsonDatabase(IDatabase):
     def __init__(self, data: Union[dict] = None, filepath: Path = None) -> None:
         self._data = data or {}
         self._filepath = filepath
-        self.__lock = threading.Lock()
+        self._dirty = False
+
+    # no locking here: every mutation below is a single dict/list operation,
+    # which the GIL already makes atomic, and readers only ever see the dict
+    # before or after such an operation
 
     def add(self, row: ITable) -> None:
-        with self.__lock:
+        self._data.setdefault(row.__tablename__, []).append(row)
+        self._dirty = True
+
+    def add_many(self, rows: Iterable[ITable]) -> None:
+        for row in rows:
             self._data.setdefault(row.__tablename__, []).append(row)
-            self.save()
+        self._dirty = True
 
     def connect(self) -> JsonDatabase:
-        with self.__lock:
-            self._load()
+        self._load()
         return self
 
     def fetch(self, table_class: Type[T], **filter_by) -> List[T]:
-        with self.__lock:
-            all_results = self._data.get(table_class.__tablename__, [])
-            results = [
-                x
-                for x in all_results
-                if all(getattr(x, k) == v for k, v in filter_by.items())
-            ]
-            return results
+        all_results = self._data.get(table_class.__tablename__, [])
+        results = [
+            x
+            for x in all_results
+            if all(getattr(x, k) == v for k, v in filter_by.items())
+        ]
+        return results
 
     def fetch_first(self, table_class: Type[T], **filter_by) -> Optional[T]:
-        with self.__lock:
-            all_results = self._data.get(table_class.__tablename__, [])
-            results = (
-                x
-                for x in all_results
-                if all(getattr(x, k) == v for k, v in filter_by.items())
-            )
-            try:
-                result = next(results)
-            except StopIteration:
-                return None
-            else:
-                return result
+        all_results = self._data.get(table_class.__tablename__, [])
+        results = (
+            x
+            for x in all_results
+            if all(getattr(x, k) == v for k, v in filter_by.items())
+        )
+        try:
+            result = next(results)
+        except StopIteration:
+            return None
+        else:
+            return result
 
     def fetch_one_or_none(self, table_class: Type[T], **filter_by) -> Optional[T]:
-        with self.__lock:
-            all_results = self._data.get(table_class.__tablename__, [])
-            results = (
-                x
-                for x in all_results
-                if all(getattr(x, k) == v for k, v in filter_by.items())
-            )
+        all_results = self._data.get(table_class.__tablename__, [])
+        results = (
+            x
+            for x in all_results
+            if all(getattr(x, k) == v for k, v in filter_by.items())
+        )
+        try:
+            result = next(results)
+        except StopIteration:
+            return None
+        else:
             try:
-                result = next(results)
+                next(results)
             except StopIteration:
-                return None
+                return result
             else:
-                try:
-                    next(results)
-                except StopIteration:
-                    return result
-                else:
-                    raise DatabaseError("Multiple entries found")
+                raise DatabaseError("Multiple entries found")
 
     def fetch_all(self, table_class: Type[T]) -> List[T]:
-        with self.__lock:
-            return self._data.get(table_class.__tablename__, [])
+        return self._data.get(table_class.__tablename__, [])
+
+    def mark_dirty(self) -> None:
+        """Record that rows fetched from this database have been mutated in
+        place, so the next save() must hit disk.
+        """
+        self._dirty = True
 
     def new(self) -> None:
-        with self.__lock:
-            self._data = {}
-            self.save()
+        self._data = {}
+        self._dirty = True
+        self.save()
 
     def remove(self, table_class: Type[T], **filter_by) -> None:
-        with self.__lock:
-            self._data[table_class.__tablename__] = [
-                x
-                for x in self._data.get(table_class.__tablename__, [])
-                if any(getattr(x, k) != v for k, v in filter_by.items())
-            ]
+        self._data[table_class.__tablename__] = [
+            x
+            for x in self._data.get(table_class.__tablename__, [])
+            if any(getattr(x, k) != v for k, v in filter_by.items())
+        ]
+        self._dirty = True
 
     def _load(self) -> None:
-        with self._filepath.open("r") as file_pointer:
-            try:
-                data = json.load(file_pointer, cls=DatabaseDecoder)
-            except json.JSONDecodeError as err:
-                logger.error(err)
-                data = {}
-            self._data = data
+        raw = self._filepath.read_bytes()
+        try:
+            if orjson is not None:
+                data = _decode(orjson.loads(raw))
+            else:
+                data = json.loads(raw, cls=DatabaseDecoder)
+        except ValueError as err:
+            logger.error(err)
+            data = {}
+        self._data = data
+        self._dirty = False
 
     def save(self) -> None:
-        with self._filepath.open("w") as file_pointer:
-            json.dump(self, file_pointer, indent=4, cls=DatabaseEncoder)
+        if not self._dirty:
+            return
+        if orjson is not None:
+            raw = orjson.dumps(
+                self._data,
+                default=_encode_default,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        else:
+            # a plain default function keeps the stdlib path on the C encoder,
+            # which a JSONEncoder subclass with indentation opts out of
+            raw = json.dumps(self._data, default=_encode_default).encode()
+        # serialize fully in memory, then one buffered write to a sibling file
+        # and an atomic rename, so a crash mid-save cannot truncate the
+        # database
+        tmp_filepath = self._filepath.with_suffix(".tmp")
+        with tmp_filepath.open("wb") as file_pointer:
+            file_pointer.write(raw)
             file_pointer.flush()
+            os.fsync(file_pointer.fileno())
+        os.replace(tmp_filepath, self._filepath)
+        # only mark clean once the data is safely on disk; a failed save must
+        # leave the database dirty so the changes are retried next time
+        self._dirty = False
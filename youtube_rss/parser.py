@@ -1,112 +1,106 @@
+import functools
+import io
 import logging
 import re
 import shutil
+import threading
 import urllib
-from html.parser import HTMLParser
-from multiprocessing import Process, ProcessError
+import xml.etree.ElementTree as ElementTree
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
-import feedparser
 import requests
 
-from . import utils
+from . import db, utils
 from .config import CONFIG
 
-logger = logging.getLogger(__name__)
-
+try:
+    # RE2 matches in linear time, which is worth having on the large search
+    # pages; fall back to the stdlib engine when it is not installed
+    import re2
+except ImportError:
+    re2 = None
 
-class RssAddressParser(HTMLParser):
-    """Parser used for extracting an RSS Address from channel page HTML."""
+try:
+    # requests only decodes brotli bodies when a brotli package is installed,
+    # so only advertise it in that case
+    import brotli
+except ImportError:
+    brotli = None
 
-    def __init__(self):
-        super().__init__(convert_charrefs=True)
-        self.rss_address = None
+logger = logging.getLogger(__name__)
 
-    def handle_starttag(self, tag, attrs):
-        attr_dict = dict(attrs)
-        if "type" in attr_dict and attr_dict["type"] == "application/rss+xml":
-            self.rss_address = attr_dict["href"]
+_re_engine = re2 if re2 is not None else re
+# \d is ASCII-only under RE2 already; the flag pins the stdlib engine to match
+_re_flags = re.ASCII if re2 is None else 0
+
+_CHANNEL_RE = _re_engine.compile(
+    # fmt: off
+    r'"channelRenderer":\{'
+    r'"channelId":"([^"]+)",'
+    r'"title":\{"simpleText":"([^"]+)"',
+    # fmt: on
+    _re_flags,
+)
+
+# fmt: off
+_VIDEO_RE = _re_engine.compile(
+    r'"videoId":"([^"]+)",'
+    r'"thumbnail":'
+    r'\{"thumbnails":\['
+    r'\{"url":"([^"]+)","width":\d+,"height":\d+\},'
+    r'\{"url":"[^"]+","width":\d+,"height":\d+\}'
+    r'\]\},'
+    r'"title":\{'
+    r'"runs":\[\{"text":"[^"]+"\}\],'
+    r'"accessibility":\{"accessibilityData":\{"label":"([^"]+)"'
+    r'\}',
+    _re_flags,
+)
+# fmt: on
+
+_ATOM_NS = "{http://www.w3.org/2005/Atom}"
+_MEDIA_NS = "{http://search.yahoo.com/mrss/}"
+
+
+def parse_rss_entries(rss_content: bytes) -> List[db.FeedEntry]:
+    """Stream-parse a YouTube Atom feed straight into FeedEntry rows. Takes
+    the raw response bytes; the XML parser reads the encoding from the
+    document itself.
+    """
+    entries = []
+    for _, element in ElementTree.iterparse(io.BytesIO(rss_content)):
+        if element.tag != _ATOM_NS + "entry":
+            continue
+        link = element.find(_ATOM_NS + "link")
+        thumbnail = element.find(_MEDIA_NS + "group/" + _MEDIA_NS + "thumbnail")
+        entries.append(
+            db.FeedEntry(
+                video_id=element.findtext(_ATOM_NS + "id"),
+                link=link.get("href") if link is not None else None,
+                title=element.findtext(_ATOM_NS + "title"),
+                thumbnail=thumbnail.get("url") if thumbnail is not None else None,
+                seen=False,
+            )
+        )
+        element.clear()
+    return entries
 
 
-class ChannelQueryParser(HTMLParser):
-    """Parser used for extracting information about channels from YouTube channel query
-    HTML.
-    """
+_RSS_HREF_RE = _re_engine.compile(
+    r'<link[^>]*type="application/rss\+xml"[^>]*href="([^"]+)"', _re_flags
+)
 
-    def __init__(self):
-        super().__init__(convert_charrefs=True)
-        self.is_script_tag = False
-        self.result_list: List[ChannelQueryObject] = None
-
-    def handle_starttag(self, tag, attrs):
-        if tag == "script":
-            self.is_script_tag = True
-
-    def handle_data(self, data):
-        if self.is_script_tag:
-            self.is_script_tag = False
-            if "var ytInitialData" in data:
-                pattern = re.compile(
-                    # fmt: off
-                    r'"channelRenderer":\{'
-                    r'"channelId":"([^"]+)",'
-                    r'"title":\{"simpleText":"([^"]+)"'
-                    # fmt: on
-                )
-                tuple_list = pattern.findall(data)
-                result_list = []
-                for tup in tuple_list:
-                    result_list.append(
-                        ChannelQueryObject(channel_id=tup[0], title=tup[1])
-                    )
-                self.result_list = result_list
-
-
-class VideoQueryParser(HTMLParser):
-    """Parser used for extracting information about channels from YouTube channel query
-    HTML.
-    """
 
-    def __init__(self):
-        super().__init__(convert_charrefs=True)
-        self.is_script_tag = False
-        self.result_list: List[VideoQueryObject] = None
-
-    def handle_starttag(self, tag, attrs):
-        if tag == "script":
-            self.is_script_tag = True
-
-    def handle_data(self, data):
-        if self.is_script_tag:
-            self.is_script_tag = False
-            if "var ytInitialData" in data:
-                # fmt: off
-                pattern = re.compile(
-                    r'videoId":"([^"]+)",'
-                    r'"thumbnail":'
-                    r'{"thumbnails":\['
-                    r'\{"url":"([^"]+)","width":[0-9]+,"height":[0-9]+\},'
-                    r'\{"url":"[^"]+","width":[0-9]+,"height":[0-9]+\}'
-                    r'\]\},'
-                    r'"title":\{'
-                    r'"runs":\[\{"text":"[^"]+"\}\],'
-                    r'"accessibility":\{"accessibilityData":\{"label":"([^"]+)"'
-                    r'\}'
-                )
-                # fmt: on
-                tuple_list = pattern.findall(data)
-                result_list = []
-                for tup in tuple_list:
-                    result_list.append(
-                        VideoQueryObject(
-                            video_id=tup[0], thumbnail=tup[1], title=tup[2]
-                        )
-                    )
-                self.result_list = result_list
+def get_rss_address_from_channel_html(html_content: str) -> Optional[str]:
+    """Extract the RSS address from channel page HTML."""
+    match = _RSS_HREF_RE.search(html_content)
+    return match.group(1) if match is not None else None
 
 
 class VideoQueryObject:
+    __slots__ = ("video_id", "thumbnail", "title", "url", "thumbnail_file")
+
     def __init__(self, video_id=None, thumbnail=None, title=None):
         self.video_id = video_id
         self.thumbnail = thumbnail
@@ -121,6 +115,8 @@ class VideoQueryObject:
 
 
 class ChannelQueryObject:
+    __slots__ = ("channel_id", "title")
+
     def __init__(self, channel_id=None, title=None):
         self.channel_id = channel_id
         self.title = title
@@ -129,88 +125,139 @@ class ChannelQueryObject:
         return f"{self.title}  --  (channel ID {self.channel_id})"
 
 
-def get_http_content(url, method="GET", post_payload=None):
-    session = requests.Session()
-    session.headers["Accept-Language"] = "en-US"
-    # This cookie lets us avoid the YouTube consent page
-    session.cookies["CONSENT"] = "YES+"
+_local = threading.local()
+
+_BASE_HEADERS = {
+    "Accept-Language": "en-US",
+    # the search pages compress ~5x; be explicit rather than relying on the
+    # transport's defaults
+    "Accept-Encoding": "gzip, deflate, br" if brotli is not None else "gzip, deflate",
+}
+# This cookie lets us avoid the YouTube consent page
+_BASE_COOKIES = {"CONSENT": "YES+"}
+
+
+def _get_session() -> requests.Session:
+    """Session objects are not thread-safe, so keep one per thread; each keeps
+    its connections alive between calls.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(_BASE_HEADERS)
+        session.cookies.update(_BASE_COOKIES)
+        _local.session = session
+    return session
+
+
+def get_http_content(url, method="GET", post_payload=None, headers=None):
+    session = _get_session()
     if method == "GET":
-        return session.get(url)
+        return session.get(url, headers=headers)
     elif method == "POST":
-        return session.post(url, post_payload or {})
+        return session.post(url, post_payload or {}, headers=headers)
 
 
+def download_to_file(url, filepath: Path) -> None:
+    """Stream a response body to disk in chunks rather than holding the whole
+    payload in memory first.
+    """
+    with _get_session().get(url, stream=True) as response:
+        with filepath.open("wb") as file_pointer:
+            for chunk in response.iter_content(chunk_size=65536):
+                file_pointer.write(chunk)
+
+
+@functools.lru_cache(maxsize=1024)
 def get_rss_address_from_channel_id(channel_id: str) -> str:
     return f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
 
 
 def get_channel_query_results(query) -> List[ChannelQueryObject]:
     """Get a list of channels that match a query."""
-    url = (
-        "https://youtube.com/results?search_query="
-        + urllib.parse.quote(query)
-        + "&sp=EgIQAg%253D%253D"
+    url = "https://youtube.com/results?" + urllib.parse.urlencode(
+        {"search_query": query, "sp": "EgIQAg%3D%3D"}
     )
     html_content = get_http_content(url).text
-    p = ChannelQueryParser()
-    p.feed(html_content)
-    return p.result_list
+    data_index = html_content.find("var ytInitialData")
+    if data_index == -1:
+        # not a results page (consent wall, captcha, ...); nothing to scan
+        return []
+    return [
+        ChannelQueryObject(channel_id=match.group(1), title=match.group(2))
+        for match in _CHANNEL_RE.finditer(html_content, data_index)
+    ]
 
 
 def get_video_query_results(query: str) -> List[VideoQueryObject]:
     """Get a list of videos that match a query."""
-    url = (
-        "https://youtube.com/results?search_query="
-        + urllib.parse.quote(query)
-        + "&sp=EgIQAQ%253D%253D"
+    url = "https://youtube.com/results?" + urllib.parse.urlencode(
+        {"search_query": query, "sp": "EgIQAQ%3D%3D"}
     )
     html_content = get_http_content(url).text
-    p = VideoQueryParser()
-    p.feed(html_content)
+    data_index = html_content.find("var ytInitialData")
+    if data_index == -1:
+        return []
+    result_list = [
+        VideoQueryObject(
+            video_id=match.group(1),
+            thumbnail=match.group(2),
+            title=match.group(3),
+        )
+        for match in _VIDEO_RE.finditer(html_content, data_index)
+    ]
     if CONFIG.USE_THUMBNAILS:
         if CONFIG.THUMBNAIL_SEARCH_DIR.is_dir():
             shutil.rmtree(CONFIG.THUMBNAIL_SEARCH_DIR)
 
         CONFIG.THUMBNAIL_SEARCH_DIR.mkdir()
-        process = Process(
-            target=get_search_thumbnails,
-            args=(p.result_list,),
-        )
-        try:
-            process.start()
-            process.join()
-        except Exception as e:
-            logger.error(e)
-            process.kill()
-            raise e
-        if process.exitcode != 0:
-            raise ProcessError
-    return p.result_list
-
-
-def get_rss_entries_from_channel_id(channel_id):
+        get_search_thumbnails(result_list)
+    return result_list
+
+
+def get_rss_entries_from_channel_id(channel_id, etag=None, modified=None):
+    """Fetch the RSS entries for a channel, returning a tuple of
+    (entries, etag, modified). The validators are sent back as a conditional
+    request; if the feed is unchanged the server answers 304 and entries is
+    None.
+    """
     rss_address = get_rss_address_from_channel_id(channel_id)
-    rss_content = get_http_content(rss_address).text
-    entries = feedparser.parse(rss_content)["entries"]
-    return entries
+    headers = {}
+    if etag is not None:
+        headers["If-None-Match"] = etag
+    if modified is not None:
+        headers["If-Modified-Since"] = modified
+    response = get_http_content(rss_address, headers=headers)
+    if response.status_code == 304:
+        return None, etag, modified
+    # a dead channel or rate-limit page answers with an error status and an
+    # HTML body; surface it as an HTTPError so the retry loops handle it
+    response.raise_for_status()
+    try:
+        entries = parse_rss_entries(response.content)
+    except ElementTree.ParseError as err:
+        # a 2xx body that is not a feed (consent wall and the like); treat the
+        # feed as unchanged rather than crashing the refresh
+        logger.error("could not parse feed for %s: %s", channel_id, err)
+        return None, etag, modified
+    return (
+        entries,
+        response.headers.get("ETag"),
+        response.headers.get("Last-Modified"),
+    )
 
 
 def get_search_thumbnail_from_search_result(result):
-    video_id = result.video_id.split(":")[-1]
-    thumbnail_filename: Path = CONFIG.THUMBNAIL_SEARCH_DIR / video_id + ".jpg"
-    thumbnail_content = get_http_content(result.thumbnail)
-    result.thumbnailFile = thumbnail_filename
-    thumbnail_filename.write_bytes(thumbnail_content.content)
+    video_id = result.video_id.rsplit(":", 1)[-1]
+    thumbnail_filename: Path = CONFIG.THUMBNAIL_SEARCH_DIR / f"{video_id}.jpg"
+    result.thumbnail_file = thumbnail_filename
+    download_to_file(result.thumbnail, thumbnail_filename)
 
 
 def get_search_thumbnails(result_list):
-    threads = []
-    for result in result_list:
-        thread = utils.ErrorCatchingThread(
-            get_search_thumbnail_from_search_result,
-            result,
-        )
-        threads.append(thread)
-        thread.start()
-    for thread in threads:
-        thread.join()
+    executor = utils.get_executor()
+    futures = [
+        executor.submit(get_search_thumbnail_from_search_result, result)
+        for result in result_list
+    ]
+    utils.wait_all(futures)
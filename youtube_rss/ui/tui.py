@@ -52,13 +52,30 @@ class TUI(BaseUI):
         return curses.wrapper(_yes_no_query_ncurses, prompt)
 
 
+# key sets used on every keystroke, built once for O(1) membership checks
+_BACKSPACE_KEYS = frozenset((curses.KEY_BACKSPACE, ord("\b"), ord("\x7f")))
+_ENTER_KEYS = frozenset((curses.KEY_ENTER, 10, 13))
+_DIGIT_ORDS = frozenset(map(ord, "1234567890"))
+
+_colors_initialized = False
+
+
+def _ensure_colors():
+    """Initialize the highlight color pairs once per process."""
+    global _colors_initialized
+    if _colors_initialized:
+        return
+    curses.init_pair(CONFIG.HIGHLIGHTED, curses.COLOR_BLACK, curses.COLOR_WHITE)
+    curses.init_pair(CONFIG.NOT_HIGHLIGHTED, curses.COLOR_WHITE, curses.COLOR_BLACK)
+    _colors_initialized = True
+
+
 def _wait_screen_ncurses(stdscr, message, wait_function, *args, **kwargs):
     """Ncurses level of do_wait_screen starts. It should never be called
     directly, but always through do_wait_screen.
     """
     curses.curs_set(0)
-    curses.init_pair(CONFIG.HIGHLIGHTED, curses.COLOR_BLACK, curses.COLOR_WHITE)
-    curses.init_pair(CONFIG.NOT_HIGHLIGHTED, curses.COLOR_WHITE, curses.COLOR_BLACK)
+    _ensure_colors()
     print_menu(message, [], stdscr, 0, show_item_number=False)
     return wait_function(*args, **kwargs)
 
@@ -86,14 +103,24 @@ def _select_query_ncurses(
     through do_selection_query.
     """
     curses.curs_set(0)
-    curses.init_pair(CONFIG.HIGHLIGHTED, curses.COLOR_BLACK, curses.COLOR_WHITE)
-    curses.init_pair(CONFIG.NOT_HIGHLIGHTED, curses.COLOR_WHITE, curses.COLOR_BLACK)
-    jump_num_list = []
+    _ensure_colors()
+    adhoc_keys = adhoc_keys or []
+    # one hash lookup decides whether the pressed key is an ad hoc key at all;
+    # several ad hoc keys may share an ordinal, so the match still scans them
+    adhoc_key_ords = {adhoc_key.key for adhoc_key in adhoc_keys}
+    # the jump number is kept as an int and extended a digit at a time, rather
+    # than accumulating characters and re-parsing them on enter
+    jump_num = 0
+    jump_num_digits = 0
     if initial_index is not None:
         choice_index = initial_index
     else:
         choice_index = 0
 
+    # the options do not change while the menu is open, so lay them out once
+    # rather than on every keystroke
+    menu_width = _menu_width(options, show_item_number) if options else None
+
     while True:
         with (
             ueberzug.Canvas() if CONFIG.USE_THUMBNAILS else contextlib.suppress()
@@ -104,14 +131,15 @@ def _select_query_ncurses(
                 stdscr,
                 choice_index,
                 show_item_number=show_item_number,
-                jump_num_str="".join(jump_num_list),
+                jump_num_str=str(jump_num) if jump_num_digits else "",
                 canvas=canvas,
+                menu_width=menu_width,
             )
             key = stdscr.getch()
             # Ad hoc keys should always take first precedence
 
-            if key in (adhoc_keys or []):
-                for adhoc_key in adhoc_keys or []:
+            if key in adhoc_key_ords:
+                for adhoc_key in adhoc_keys:
                     if adhoc_key.is_valid_index(choice_index):
                         if query_style is QueryStyle.ITEM_QUERY_STYLE:
                             return adhoc_key.item
@@ -121,30 +149,31 @@ def _select_query_ncurses(
                             return adhoc_key.item, choice_index
 
             elif key in (curses.KEY_UP, ord("k")):
-                jump_num_list = []
+                jump_num = jump_num_digits = 0
                 choice_index = (choice_index - 1) % len(options)
             elif key in (curses.KEY_DOWN, ord("j")):
-                jump_num_list = []
+                jump_num = jump_num_digits = 0
                 choice_index = (choice_index + 1) % len(options)
-            elif key in (ord(digit) for digit in "1234567890"):
-                if len(jump_num_list) < 6:
-                    jump_num_list.append(chr(key))
-            elif key in [curses.KEY_BACKSPACE, ord("\b"), ord("\x7f")]:
-                if jump_num_list:
-                    jump_num_list.pop()
+            elif key in _DIGIT_ORDS:
+                if jump_num_digits < 6:
+                    jump_num = jump_num * 10 + (key - ord("0"))
+                    jump_num_digits += 1
+            elif key in _BACKSPACE_KEYS:
+                if jump_num_digits:
+                    jump_num //= 10
+                    jump_num_digits -= 1
             elif key == ord("g"):
-                jump_num_list = []
+                jump_num = jump_num_digits = 0
                 choice_index = 0
             elif key == ord("G"):
-                jump_num_list = []
+                jump_num = jump_num_digits = 0
                 choice_index = len(options) - 1
             elif key in (ord("q"), ord("h"), curses.KEY_LEFT):
                 raise KeyboardInterrupt
             elif key in (curses.KEY_ENTER, 10, 13, ord("l"), curses.KEY_RIGHT):
-                if jump_num_list:
-                    jump_num = int("".join(jump_num_list))
+                if jump_num_digits:
                     choice_index = min(jump_num - 1, len(options) - 1)
-                    jump_num_list = []
+                    jump_num = jump_num_digits = 0
                 elif query_style is QueryStyle.ITEM_QUERY_STYLE:
                     return options[choice_index]
                 elif query_style is QueryStyle.INDEX_QUERY_STYLE:
@@ -160,20 +189,19 @@ def _user_input_ncurses(stdscr, query, max_input_length=40):
     but always through do_get_user_input.
     """
     curses.curs_set(0)
-    curses.init_pair(CONFIG.HIGHLIGHTED, curses.COLOR_BLACK, curses.COLOR_WHITE)
-    curses.init_pair(CONFIG.NOT_HIGHLIGHTED, curses.COLOR_WHITE, curses.COLOR_BLACK)
+    _ensure_colors()
     curses.curs_set(0)
     cursor_position = 0
     user_input_chars = []
+    blank_ruler = " " * max_input_length
     while True:
         print_menu(
             query,
             [
                 "".join(user_input_chars),
-                "".join(
-                    "—" if i == cursor_position else " "
-                    for i in range(max_input_length)
-                ),
+                blank_ruler[:cursor_position]
+                + "—"
+                + blank_ruler[cursor_position + 1 :],
             ],
             stdscr,
             0,
@@ -181,7 +209,7 @@ def _user_input_ncurses(stdscr, query, max_input_length=40):
             show_item_number=False,
         )
         key = stdscr.getch()
-        if key in (curses.KEY_BACKSPACE, ord("\b"), ord("\x7f")):
+        if key in _BACKSPACE_KEYS:
             delete_index = cursor_position - 1
             if delete_index >= 0:
                 user_input_chars.pop(cursor_position - 1)
@@ -190,7 +218,7 @@ def _user_input_ncurses(stdscr, query, max_input_length=40):
             delete_index = cursor_position + 1
             if delete_index <= len(user_input_chars):
                 user_input_chars.pop(cursor_position)
-        elif key in (curses.KEY_ENTER, 10, 13):
+        elif key in _ENTER_KEYS:
             return "".join(user_input_chars)
         elif key == curses.KEY_LEFT:
             cursor_position = max(0, cursor_position - 1)
@@ -203,6 +231,14 @@ def _user_input_ncurses(stdscr, query, max_input_length=40):
             cursor_position = min(max_input_length, cursor_position + 1)
 
 
+def _menu_width(menu, show_item_number=True):
+    """Width of the widest rendered menu row."""
+    return max(
+        len(f"{i+1}: {item}" if show_item_number else str(item))
+        for i, item in enumerate(menu)
+    )
+
+
 def print_menu(
     query,
     menu,
@@ -212,6 +248,7 @@ def print_menu(
     show_item_number=True,
     jump_num_str="",
     canvas=None,
+    menu_width=None,
 ):
     """Visually represent a query and a number of menu items to the user, by
     using nCurses. It is used for all text printing in the program (even where
@@ -227,10 +264,8 @@ def print_menu(
     if x_alignment is not None:
         item_x = max(min(screen_center_x - x_alignment, width - 2), 0)
     elif menu:
-        menu_width = max(
-            len(f"{i+1}: {item}" if show_item_number else str(item))
-            for i, item in enumerate(menu)
-        )
+        if menu_width is None:
+            menu_width = _menu_width(menu, show_item_number)
         item_x = max(screen_center_x - menu_width // 2, 0)
     else:
         item_x = None
@@ -261,13 +296,14 @@ def print_menu(
         query = query[0 : width - 1]
     if 0 <= title_y < height - 1:
         stdscr.addstr(title_y, title_x, query)
+    highlighted_attr = curses.color_pair(CONFIG.HIGHLIGHTED)
+    not_highlighted_attr = curses.color_pair(CONFIG.NOT_HIGHLIGHTED)
+    base_y = screen_center_y - n_rows_to_print // 2 + 2 - offset
     for i, item in enumerate(menu):
         item_string = f"{i+1}: {item}" if show_item_number else str(item)
         if item_x + len(item_string) >= width - 1:
             item_string = item_string[: max((width - item_x - 2), 0)]
-        attr = curses.color_pair(
-            CONFIG.HIGHLIGHTED if i == choice_index else CONFIG.NOT_HIGHLIGHTED
-        )
+        attr = highlighted_attr if i == choice_index else not_highlighted_attr
         if (
             i == choice_index
             and hasattr(item, "description")
@@ -288,7 +324,7 @@ def print_menu(
                 thumbnail_placement.path = item.description.get_thumbnail()
                 thumbnail_placement.visibility = ueberzug.Visibility.VISIBLE
         stdscr.attron(attr)
-        item_y = screen_center_y - n_rows_to_print // 2 + i + 2 - offset
+        item_y = base_y + i
         if 0 <= item_y < height - 1 and item_string:
             stdscr.addstr(item_y, item_x, item_string)
         stdscr.attroff(attr)
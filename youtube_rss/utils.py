@@ -1,3 +1,4 @@
+import concurrent.futures
 import logging
 import os
 import shutil
@@ -7,6 +8,30 @@ from typing import Optional
 
 logger = logging.getLogger("youtube_rss.utils")
 
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Return the shared worker pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix="youtube_rss"
+        )
+    return _executor
+
+
+def wait_all(futures) -> None:
+    """Block until every future has finished, then re-raise the first failure
+    in submission order. Raising only after the whole batch has drained
+    matters because the pool is shared: a caller that retries while earlier
+    futures are still running would otherwise have two workers operating on
+    the same rows at once.
+    """
+    concurrent.futures.wait(futures)
+    for future in futures:
+        future.result()
+
 
 class ErrorCatchingThread(threading.Thread):
     def __init__(self, function, *args, **kwargs):
@@ -20,11 +45,10 @@ class ErrorCatchingThread(threading.Thread):
         self.exc = None
         try:
             self.function(*self.args, **self.kwargs)
-        except SystemExit as e:
-            logger.error(e)
-            raise e
+        except SystemExit:
+            raise
         except Exception as e:
-            logger.error(e)
+            logger.exception("thread %s failed", self.name)
             self.exc = e
 
     def join(self, timeout: Optional[float] = None) -> None:
@@ -40,9 +64,7 @@ class ErrorCatchingThread(threading.Thread):
     def get_thread_id(self):
         if hasattr(self, "_thread_id"):
             return self._thread_id
-        for thread_id, thread in threading._active.items():
-            if thread is self:
-                return thread_id
+        return self.ident
 
 
 def is_mpv_installed() -> bool:
@@ -1,6 +1,6 @@
 import logging
 import shutil
-from multiprocessing import Process, ProcessError
+import time
 from pathlib import Path
 from typing import List
 
@@ -13,6 +13,12 @@ logger = logging.getLogger("youtube_rss")
 
 RETURN_FROM_MENU = object()
 
+# transient network failures are retried this many times with exponential
+# backoff before the user is asked what to do
+MAX_AUTO_RETRIES = 3
+
+RESOLUTION_CHOICES = [1080, 720, 480, 240]
+
 
 # item of the sort provided in list to do_method_menu; it is provided a
 # description of an option presented to the user, a function that will be
@@ -46,8 +52,6 @@ class AdHocKey:
     def __eq__(self, other):
         if isinstance(other, int):
             return other == self.key
-        if isinstance(other, chr):
-            return other == chr(self.key)
         if isinstance(other, AdHocKey):
             return (
                 other.key == self.key
@@ -57,6 +61,9 @@ class AdHocKey:
         else:
             raise TypeError
 
+    def __hash__(self):
+        return hash(self.key)
+
 
 class MarkAllAsReadKey(AdHocKey):
     def __init__(self, channel_id, activation_index, database, key=ord("a")):
@@ -70,17 +77,19 @@ class MarkAllAsReadKey(AdHocKey):
 
 
 class MarkEntryAsReadKey(AdHocKey):
-    def __init__(self, video: db.FeedEntry, activation_index, key=ord("a")):
+    def __init__(self, video: db.FeedEntry, activation_index, database, key=ord("a")):
         item = MethodMenuDecision(
             "mark video as read",
             self._mark_read,
             video,
+            database,
         )
         super().__init__(key=key, item=item, activation_index=activation_index)
 
     @staticmethod
-    def _mark_read(video: db.FeedEntry) -> None:
+    def _mark_read(video: db.FeedEntry, database: db.IDatabase) -> None:
         video.seen = True
+        database.mark_dirty()
 
 
 # use this function to add a subscription to the database
@@ -95,6 +104,7 @@ def add_subscription_to_database(
         feed = new_feed
     else:
         feed.update(new_feed)
+        database.mark_dirty()
 
     database.save()
 
@@ -102,58 +112,35 @@ def add_subscription_to_database(
         refresh_subscriptions_by_channel_id([feed])
 
 
-def delete_thumbnails_by_channel_title(database, channel_title):
-    if channel_title not in database["title to id"]:
-        return
-    channel_id = database["title to id"][channel_title]
-    delete_thumbnails_by_channel_id(database, channel_id)
-    return
-
-
-def delete_thumbnails_by_channel_id(database, channel_id):
-    if channel_id not in database["id to title"]:
+def delete_thumbnails_by_channel_id(database: db.IDatabase, channel_id):
+    feed = database.fetch_one_or_none(db.Feed, channel_id=channel_id)
+    if feed is None:
         return
-    feed = database["feeds"][channel_id]
-    for entry in feed:
-        Path(entry["thumbnail file"]).unlink(missing_ok=True)
+    for entry in feed.entries:
+        if entry.thumbnail_file is not None:
+            Path(entry.thumbnail_file).unlink(missing_ok=True)
 
 
 # use this function to retrieve new RSS entries for a subscription and add them to
 # a database
 def refresh_subscriptions_by_channel_id(feeds: List[db.Feed]):
-    process = Process(
-        target=refresh_subscriptions_by_channel_id_process,
-        args=(feeds,),
-    )
-    try:
-        process.start()
-        process.join()
-    except Exception as e:
-        logger.error(e)
-        process.kill()
-        raise e
-    if process.exitcode != 0:
-        raise ProcessError("Non-zero exit code")
-
-
-def refresh_subscriptions_by_channel_id_process(feeds: List[db.Feed]):
     database = CONFIG.get_database()
-    threads = []
+    executor = utils.get_executor()
+    futures = []
 
     for feed in feeds:
         feed_ = database.fetch_one_or_none(db.Feed, channel_id=feed.channel_id)
         if feed_ is None:
             continue
 
-        thread = utils.ErrorCatchingThread(
-            refresh_subscription_by_channel_id,
-            feed_,
+        futures.append(
+            executor.submit(refresh_subscription_by_channel_id, feed_, database)
         )
-        threads.append(thread)
-        thread.start()
 
-    for thread in threads:
-        thread.join()
+    # drain the whole batch before raising; an auto-retry kicked off while
+    # some of these futures are still running would refresh the same feeds
+    # concurrently and could persist duplicate entries
+    utils.wait_all(futures)
 
     if CONFIG.USE_THUMBNAILS:
         get_thumbnails_for_all_subscriptions(feeds, database)
@@ -161,33 +148,29 @@ def refresh_subscriptions_by_channel_id_process(feeds: List[db.Feed]):
     database.save()
 
 
-def refresh_subscription_by_channel_id(feed: db.Feed):
-    remote_feed = parser.get_rss_entries_from_channel_id(feed.channel_id)
+def refresh_subscription_by_channel_id(feed: db.Feed, database: db.IDatabase):
+    remote_feed, feed.etag, feed.modified = parser.get_rss_entries_from_channel_id(
+        feed.channel_id, etag=feed.etag, modified=feed.modified
+    )
     if remote_feed is not None:
-        remote_feed.reverse()
+        entries_by_video_id = {entry.video_id: entry for entry in feed.entries}
+        new_entries = []
         for remote_entry in remote_feed:
-            filtered_entry = get_relevant_dict_from_feed_parser_dict(remote_entry)
-
-            for entry in feed.entries:
-                if entry.video_id == filtered_entry.video_id:
-                    # in case any relevant data about the entry is changed, update it
-                    filtered_entry.seen = entry.seen
-                    entry.update(filtered_entry)
-                    break
+            entry = entries_by_video_id.get(remote_entry.video_id)
+            if entry is not None:
+                # in case any relevant data about the entry is changed, update
+                # it, carrying over the local-only fields
+                remote_entry.seen = entry.seen
+                remote_entry.thumbnail_file = entry.thumbnail_file
+                entry.update(remote_entry)
             else:
-                feed.entries.insert(0, filtered_entry)
-
-
-# use this function to get the data we care about from the entries found by the
-# RSS parser
-def get_relevant_dict_from_feed_parser_dict(feedparser_dict) -> db.FeedEntry:
-    return db.FeedEntry(
-        video_id=feedparser_dict["id"],
-        link=feedparser_dict["link"],
-        title=feedparser_dict["title"],
-        thumbnail=feedparser_dict["media_thumbnail"][0]["url"],
-        seen=False,
-    )
+                new_entries.append(remote_entry)
+                entries_by_video_id[remote_entry.video_id] = remote_entry
+
+        # the remote feed is newest-first, so a single front splice keeps the
+        # local entries in the same order
+        feed.entries[:0] = new_entries
+        database.mark_dirty()
 
 
 """
@@ -195,15 +178,16 @@ Application control flow
 """
 
 
-def do_mark_channel_as_read(database, channel_id):
-    all_are_already_marked_as_read = True
-    for video in database["feeds"][channel_id]:
-        if not video["seen"]:
-            all_are_already_marked_as_read = False
-            break
-    for video in database["feeds"][channel_id]:
-        video["seen"] = not all_are_already_marked_as_read
-    database.to_json(CONFIG.DATABASE_PATH)
+def do_mark_channel_as_read(database: db.IDatabase, channel_id):
+    feed = database.fetch_one_or_none(db.Feed, channel_id=channel_id)
+    if feed is None or not feed.entries:
+        # nothing to toggle, so skip the database write entirely
+        return
+    all_seen = all(entry.seen for entry in feed.entries)
+    for entry in feed.entries:
+        entry.seen = not all_seen
+    database.mark_dirty()
+    database.save()
 
 
 # this is the application level flow entered when the user has chosen to search for a
@@ -211,6 +195,7 @@ def do_mark_channel_as_read(database, channel_id):
 def do_interactive_search_for_video():
     query = CONFIG.get_ui().user_input("Search for video: ")
     querying = True
+    attempt = 0
     while querying:
         try:
             result_list = CONFIG.get_ui().wait_screen(
@@ -235,36 +220,41 @@ def do_interactive_search_for_video():
             else:
                 CONFIG.get_ui().notify("no results found")
                 querying = False
-        except ProcessError as e:
+        except requests.exceptions.RequestException as e:
             logger.error(e)
+            if attempt < MAX_AUTO_RETRIES:
+                time.sleep(0.5 * 2**attempt)
+                attempt += 1
+                continue
             if not CONFIG.get_ui().yes_no_query("Something went wrong. Try again?"):
                 querying = False
+            attempt = 0
 
     if CONFIG.THUMBNAIL_SEARCH_DIR.is_dir():
         shutil.rmtree(CONFIG.THUMBNAIL_SEARCH_DIR)
 
 
-def get_thumbnails_for_all_subscriptions(channel_id_list, database):
-    feeds = database["feeds"]
-    threads = []
-    for channel_id in channel_id_list:
-        feed = feeds[channel_id]
-        thread = utils.ErrorCatchingThread(get_thumbnails_for_feed, feed)
-        threads.append(thread)
-        thread.start()
-    for thread in threads:
-        thread.join()
+def get_thumbnails_for_all_subscriptions(feeds: List[db.Feed], database):
+    executor = utils.get_executor()
+    pending = [
+        feed
+        for feed in feeds
+        if any(entry.thumbnail_file is None for entry in feed.entries)
+    ]
+    if pending:
+        database.mark_dirty()
+    futures = [executor.submit(get_thumbnails_for_feed, feed) for feed in pending]
+    utils.wait_all(futures)
 
 
-def get_thumbnails_for_feed(feed):
-    for entry in feed:
-        if "thumbnail file" in entry:
+def get_thumbnails_for_feed(feed: db.Feed):
+    for entry in feed.entries:
+        if entry.thumbnail_file is not None:
             continue
-        video_id = entry["id"].split(":")[-1]
-        thumbnail_filename = CONFIG.THUMBNAIL_DIR / video_id + ".jpg"
-        thumbnail_content = parser.get_http_content(entry["thumbnail"])
-        entry["thumbnail file"] = thumbnail_filename
-        thumbnail_filename.write_bytes(thumbnail_content.content)
+        video_id = entry.video_id.rsplit(":", 1)[-1]
+        thumbnail_filename = CONFIG.THUMBNAIL_DIR / f"{video_id}.jpg"
+        entry.thumbnail_file = str(thumbnail_filename)
+        parser.download_to_file(entry.thumbnail, thumbnail_filename)
 
 
 # this is the application level flow entered when the user has chosen to subscribe to a
@@ -272,6 +262,7 @@ def get_thumbnails_for_feed(feed):
 def do_interactive_channel_subscribe():
     query = CONFIG.get_ui().user_input("Enter channel to search for: ")
     querying = True
+    attempt = 0
     while querying:
         try:
             result_list = CONFIG.get_ui().wait_screen(
@@ -302,21 +293,27 @@ def do_interactive_channel_subscribe():
                     querying = False
         except requests.exceptions.ConnectionError as e:
             logger.error(e)
+            if attempt < MAX_AUTO_RETRIES:
+                time.sleep(0.5 * 2**attempt)
+                attempt += 1
+                continue
             if not CONFIG.get_ui().yes_no_query(
                 "Something went wrong with the connection. Try again?"
             ):
                 querying = False
+            attempt = 0
 
 
 # this is the application level flow entered when the user has chosen a channel that it
 # wants to subscribe to
 def do_channel_subscribe(result: parser.ChannelQueryObject):
-    database: db.IDatabase = CONFIG.get_ui().wait_screen("", CONFIG.get_database)
+    database: db.IDatabase = CONFIG.get_database()
 
     if database.fetch(db.Feed, channel_id=result.channel_id):
         CONFIG.get_ui().notify("Already subscribed to this channel!")
         return
 
+    attempt = 0
     while True:
         try:
             CONFIG.get_ui().wait_screen(
@@ -329,11 +326,16 @@ def do_channel_subscribe(result: parser.ChannelQueryObject):
             break
         except requests.exceptions.ConnectionError as e:
             logger.error(e)
+            if attempt < MAX_AUTO_RETRIES:
+                time.sleep(0.5 * 2**attempt)
+                attempt += 1
+                continue
             if not CONFIG.get_ui().yes_no_query(
                 "Something went wrong with the " + "connection. Try again?"
             ):
                 do_channel_unsubscribe(result.channel_id)
                 break
+            attempt = 0
 
     return RETURN_FROM_MENU
 
@@ -341,7 +343,7 @@ def do_channel_subscribe(result: parser.ChannelQueryObject):
 # this is the application level flow entered when the user has chosen to unsubscribe to
 # a channel
 def do_interactive_channel_unsubscribe():
-    database: db.IDatabase = CONFIG.get_ui().wait_screen("", CONFIG.get_database)
+    database: db.IDatabase = CONFIG.get_database()
     if not database.fetch_first(db.Feed):
         CONFIG.get_ui().notify("You are not subscribed to any channels")
         return
@@ -356,10 +358,10 @@ def do_interactive_channel_unsubscribe():
 # this is the application level flow entered when the user has chosen a channel that it
 # wants to unsubscribe from
 def do_channel_unsubscribe(channel_id):
-    database = CONFIG.get_ui().wait_screen("", CONFIG.get_database)
-    database.remove(db.Feed, channel_id=channel_id)
+    database = CONFIG.get_database()
     if CONFIG.USE_THUMBNAILS:
-        delete_thumbnails_by_channel_title(database, channel_id)
+        delete_thumbnails_by_channel_id(database, channel_id)
+    database.remove(db.Feed, channel_id=channel_id)
     database.save()
     return RETURN_FROM_MENU
 
@@ -380,21 +382,19 @@ def describe_feed(feed: db.Feed) -> str:
 # this is the application level flow entered when the user has chosen to browse
 # its current subscriptions
 def do_interactive_browse_subscriptions():
-    database: db.IDatabase = CONFIG.get_ui().wait_screen("", CONFIG.get_database)
-    menu_options = [
-        MethodMenuDecision(
-            describe_feed(feed),
-            do_select_video_from_subscription,
-            database,
-            feed.channel_id,
+    database: db.IDatabase = CONFIG.get_database()
+    menu_options = []
+    adhoc_keys = []
+    for i, feed in enumerate(database.fetch_all(db.Feed)):
+        menu_options.append(
+            MethodMenuDecision(
+                describe_feed(feed),
+                do_select_video_from_subscription,
+                database,
+                feed.channel_id,
+            )
         )
-        for feed in database.fetch_all(db.Feed)
-    ]
-
-    adhoc_keys = [
-        MarkAllAsReadKey(channel_id, i + 1, database)
-        for i, channel_id in enumerate(database.fetch_all(db.Feed))
-    ]
+        adhoc_keys.append(MarkAllAsReadKey(feed.channel_id, i + 1, database))
 
     if not menu_options:
         CONFIG.get_ui().notify("You are not subscribed to any channels")
@@ -431,9 +431,9 @@ def do_select_video_from_subscription(database: db.IDatabase, channel_id):
     ]
 
     adhoc_keys = [
-        MarkEntryAsReadKey(video, i + 1) for i, video in enumerate(feed.entries)
+        MarkEntryAsReadKey(video, i + 1, database)
+        for i, video in enumerate(feed.entries)
     ]
-    database.save()
     menu_options.insert(0, MethodMenuDecision("[Go back]", return_from_menu))
     do_method_menu(
         "Which video do you want to watch?", menu_options, adhoc_keys=adhoc_keys
@@ -445,17 +445,17 @@ def do_select_video_from_subscription(database: db.IDatabase, channel_id):
 # while browsing its current subscriptions
 def do_play_video_from_subscription(database: db.IDatabase, video: db.FeedEntry):
     result = play_video(video.link)
-    if not video.seen:
+    if not video.seen and result:
         video.seen = result
+        database.mark_dirty()
         database.save()
 
 
 # this is the application level flow entered when the user is watching any video from
 # YouTube
 def play_video(video_url):
-    resolution_menu_list = [1080, 720, 480, 240]
     max_resolution = CONFIG.get_ui().select_query(
-        "Which maximum resolution do you want to use?", resolution_menu_list
+        "Which maximum resolution do you want to use?", RESOLUTION_CHOICES
     )
     result = False
     while not result:
@@ -475,8 +475,9 @@ def play_video(video_url):
 # this is the application level flow entered when the user has chosen to refresh its
 # subscriptions
 def do_refresh_subscriptions():
-    database: db.IDatabase = CONFIG.get_ui().wait_screen("", CONFIG.get_database)
+    database: db.IDatabase = CONFIG.get_database()
     feeds = database.fetch_all(db.Feed)
+    attempt = 0
     while True:
         try:
             CONFIG.get_ui().wait_screen(
@@ -485,11 +486,16 @@ def do_refresh_subscriptions():
                 feeds,
             )
             break
-        except ProcessError as e:
+        except requests.exceptions.RequestException as e:
             logger.error("Failed to refresh subscriptions")
             logger.error(e)
+            if attempt < MAX_AUTO_RETRIES:
+                time.sleep(0.5 * 2**attempt)
+                attempt += 1
+                continue
             if not CONFIG.get_ui().yes_no_query("Something went wrong. Try again?"):
                 break
+            attempt = 0
 
 
 def do_main_menu():